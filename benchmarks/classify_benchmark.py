@@ -0,0 +1,95 @@
+"""Benchmark parsing many questions.
+
+Times the regex templates (a sentence_to_triple() loop, and
+sentences_to_triples()) against classify_questions(), which finds every
+reading with token-span vocabulary lookups, on questions generated from
+the biolink vocabulary. Preprocessing is timed on its own because every
+path pays for it.
+
+Usage:
+
+    python -m benchmarks.classify_benchmark --questions 5000 --repeat 5
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+from mouse_trapi.parse import (
+    categories, predicates, classify_questions, preprocess,
+    sentence_to_triple, sentences_to_triples, ParseError,
+)
+
+NAMES = ["asthma", "type 2 diabetes", "albuterol", "imatinib", "cystic fibrosis"]
+
+
+def questions(count: int, seed: int = 0) -> List[str]:
+    """Generate questions, one template at a time."""
+    rng = random.Random(seed)
+    vocabulary = sorted(categories), sorted(predicates)
+
+    def question(idx):
+        category, predicate = (rng.choice(phrases) for phrases in vocabulary)
+        name = rng.choice(NAMES)
+        return [
+            f"What {category} {predicate} {name}?",
+            f"What {category} does {name} {predicate}?",
+            f"{name} {predicate} what {category}?",
+        ][idx % 3]
+
+    return [question(idx) for idx in range(count)]
+
+
+def regex_loop(questions: List[str]):
+    """Parse questions one at a time."""
+    for question in questions:
+        try:
+            sentence_to_triple(question)
+        except ParseError:
+            pass
+
+
+def best_seconds(fcn: Callable[[List[str]], object], questions: List[str], repeat: int) -> float:
+    """Time fcn(questions), keeping the fastest of repeat runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fcn(questions)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None):
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.questions < 1 or args.repeat < 1:
+        parser.error("--questions and --repeat must be at least 1")
+
+    sample = questions(args.questions)
+    paths = {
+        "preprocess": lambda questions: [preprocess(question) for question in questions],
+        "sentence_to_triple": regex_loop,
+        "sentences_to_triples": sentences_to_triples,
+        "classify_questions": classify_questions,
+    }
+    results: Dict[str, float] = dict()
+    for name, fcn in paths.items():
+        results[name] = best_seconds(fcn, sample, args.repeat)
+        print(
+            f"{name}: {results[name]:.3f}s, "
+            f"{1e6 * results[name] / args.questions:.1f}us/question"
+        )
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(results | {"questions": args.questions}, stream, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""Load test the FastAPI server.
+
+The app is driven in-process through httpx's ASGI transport. The robokop
+name lookup and the node normalizer are replaced by a local stub server
+with configurable latency, so results reflect this service rather than
+the network. Memory is the resident set size sampled during each run, so
+latency is measured without allocation tracing.
+
+A response is "served" unless it is a 5xx, such as an overload rejection.
+The latency budget applies to served responses and the error budget to
+the fraction that were not served, so shedding load cannot hide latency.
+
+Usage:
+
+    python -m benchmarks.load_test --mix cache-hot --concurrency 100 1000 \
+        --workers 8 40 --p99-budget-ms 500 --error-rate-budget 0.01 \
+        --memory-budget-mb 500
+
+Exits non-zero when any run exceeds a configured budget.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import anyio.to_thread
+from fastapi import Body, FastAPI, Query
+import httpx
+import uvicorn
+
+# seconds between RSS samples
+RSS_INTERVAL = 0.05
+# histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+
+CATEGORIES = ["drugs", "chemical substances", "diseases", "genes"]
+PREDICATES = ["treat", "are related to", "interact with"]
+FAILURES = ["What aaagggh?", "Blorp?", "Who is the president?"]
+
+
+def stub_app(latency: float) -> FastAPI:
+    """Build stub lookup services."""
+    stub = FastAPI()
+
+    @stub.post("/lookup")
+    async def lookup(string: str, limit: int = 10):
+        """Stub robokop name lookup."""
+        await asyncio.sleep(latency)
+        digest = hashlib.md5(string.encode()).hexdigest()[:8]
+        return {f"STUB:{digest}": [string]}
+
+    def normalized_nodes(curies: List[str]) -> Dict:
+        return {
+            curie: {"id": {"identifier": curie, "label": curie}}
+            for curie in curies
+        }
+
+    @stub.get("/get_normalized_nodes")
+    async def get_normalized_nodes(curie: List[str] = Query(...)):
+        """Stub node normalizer."""
+        await asyncio.sleep(latency)
+        return normalized_nodes(curie)
+
+    @stub.post("/get_normalized_nodes")
+    async def post_normalized_nodes(curies: List[str] = Body(..., embed=True)):
+        """Stub node normalizer."""
+        await asyncio.sleep(latency)
+        return normalized_nodes(curies)
+
+    return stub
+
+
+def start_stub(latency: float) -> str:
+    """Start stub lookup services in a background thread and return the base URL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        stub_app(latency),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def questions(mix: str, count: int, seed: int = 0) -> List[str]:
+    """Generate a question mix."""
+    rng = random.Random(seed)
+
+    def question(name):
+        return f"What {rng.choice(CATEGORIES)} {rng.choice(PREDICATES)} {name}?"
+
+    if mix == "cache-hot":
+        hot = [question(name) for name in ["asthma", "type 2 diabetes", "albuterol"]]
+        return [rng.choice(hot) for _ in range(count)]
+    if mix == "cache-cold":
+        return [question(f"disease {idx}") for idx in range(count)]
+    if mix == "parse-failure":
+        return [
+            rng.choice(FAILURES) if rng.random() < 0.8 else question("asthma")
+            for _ in range(count)
+        ]
+    raise ValueError(f"Unknown question mix '{mix}'")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Get percentile of sorted values, or NaN if there are none."""
+    if not values:
+        return float("nan")
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def rss_mb() -> float:
+    """Get current resident set size of this process."""
+    try:
+        with open("/proc/self/statm", "r") as stream:
+            pages = int(stream.read().split()[1])
+        return pages * resource.getpagesize() / 2 ** 20
+    except OSError:
+        # no procfs: fall back to the peak so far, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def histogram(latencies_ms: List[float]) -> Dict[str, int]:
+    """Bucket latencies."""
+    counts = {f"<={bound}ms": 0 for bound in BUCKETS_MS}
+    for latency in latencies_ms:
+        bound = next(bound for bound in BUCKETS_MS if latency <= bound)
+        counts[f"<={bound}ms"] += 1
+    return counts
+
+
+async def run(app, questions: List[str], concurrency: int, workers: int) -> Dict:
+    """Send questions with `concurrency` clients and `workers` server threads."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = workers
+    queue = list(reversed(questions))
+    # (status, latency) per response
+    responses: List[Tuple[int, float]] = []
+    rss_samples = [rss_mb()]
+
+    async def client_loop(client: httpx.AsyncClient):
+        while queue:
+            question = queue.pop()
+            start = time.perf_counter()
+            response = await client.post("/to_trapi", json=question)
+            responses.append((
+                response.status_code,
+                1000 * (time.perf_counter() - start),
+            ))
+
+    async def sample_rss():
+        while True:
+            await asyncio.sleep(RSS_INTERVAL)
+            rss_samples.append(rss_mb())
+
+    sampler = asyncio.create_task(sample_rss())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    sampler.cancel()
+    rss_samples.append(rss_mb())
+    return summarize(responses, elapsed, rss_samples) | {
+        "concurrency": concurrency,
+        "workers": workers,
+    }
+
+
+def summarize(
+        responses: List[Tuple[int, float]],
+        elapsed: float,
+        rss_samples: List[float],
+) -> Dict:
+    """Summarize one run."""
+    statuses: Dict[int, int] = dict()
+    for status, _ in responses:
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies_ms = sorted(latency for _, latency in responses)
+    served_ms = sorted(latency for status, latency in responses if status < 500)
+    return {
+        "requests": len(responses),
+        "statuses": statuses,
+        "error_rate": 1 - len(served_ms) / len(responses) if responses else 0.0,
+        "throughput_rps": len(responses) / elapsed,
+        "served_rps": len(served_ms) / elapsed,
+        "p50_ms": percentile(latencies_ms, 0.50),
+        "p90_ms": percentile(latencies_ms, 0.90),
+        "p99_ms": percentile(latencies_ms, 0.99),
+        "max_ms": percentile(latencies_ms, 1.0),
+        "p99_served_ms": percentile(served_ms, 0.99),
+        "histogram": histogram(latencies_ms),
+        "rss_start_mb": rss_samples[0],
+        "rss_end_mb": rss_samples[-1],
+        "rss_peak_mb": max(rss_samples),
+    }
+
+
+def check_budgets(result: Dict, args) -> List[str]:
+    """List budget violations."""
+    violations = []
+    # NaN (nothing served) never compares greater, so check it explicitly
+    if args.p99_budget_ms is not None and not result["p99_served_ms"] <= args.p99_budget_ms:
+        violations.append(
+            f"served p99 {result['p99_served_ms']:.1f}ms > {args.p99_budget_ms}ms"
+        )
+    if args.error_rate_budget is not None and result["error_rate"] > args.error_rate_budget:
+        violations.append(
+            f"error rate {result['error_rate']:.1%} > {args.error_rate_budget:.1%}"
+        )
+    if args.memory_budget_mb is not None and result["rss_peak_mb"] > args.memory_budget_mb:
+        violations.append(
+            f"peak RSS {result['rss_peak_mb']:.1f}MB > {args.memory_budget_mb}MB"
+        )
+    return violations
+
+
+def main(argv=None):
+    """Run load tests."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--mix", choices=["cache-hot", "cache-cold", "parse-failure"], default="cache-hot")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[40])
+    parser.add_argument("--stub-latency-ms", type=float, default=20)
+    parser.add_argument("--p99-budget-ms", type=float, default=None)
+    parser.add_argument("--error-rate-budget", type=float, default=None,
+                        help="maximum fraction of 5xx responses")
+    parser.add_argument("--memory-budget-mb", type=float, default=None)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.requests < 1:
+        parser.error("--requests must be at least 1")
+
+    base_url = start_stub(args.stub_latency_ms / 1000)
+    os.environ["ROBOKOP_URL"] = f"{base_url}/lookup"
+    os.environ["NODE_NORMALIZER_URL"] = f"{base_url}/get_normalized_nodes"
+    # import only after pointing the lookups at the stub
+    from mouse_trapi.encode import label_cache
+    from mouse_trapi.parse import name_cache
+    from mouse_trapi.server import app
+
+    results = []
+    failed = False
+    for workers in args.workers:
+        for concurrency in args.concurrency:
+            if args.mix == "cache-cold":
+                name_cache.clear()
+                label_cache.clear()
+            result = asyncio.run(run(
+                app,
+                questions(args.mix, args.requests),
+                concurrency,
+                workers,
+            ))
+            result["mix"] = args.mix
+            result["violations"] = check_budgets(result, args)
+            failed = failed or bool(result["violations"])
+            results.append(result)
+            print(
+                f"{args.mix} workers={workers} concurrency={concurrency}: "
+                f"{result['throughput_rps']:.0f} req/s, "
+                f"p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms "
+                f"(served {result['p99_served_ms']:.1f}ms), "
+                f"errors={result['error_rate']:.1%}, "
+                f"RSS={result['rss_start_mb']:.0f}->{result['rss_peak_mb']:.0f}MB"
+                + "".join(f"\n  FAIL: {violation}" for violation in result["violations"])
+            )
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(results, stream, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
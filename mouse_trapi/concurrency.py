@@ -0,0 +1,77 @@
+"""Concurrency control."""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class Overloaded(Exception):
+    """Too much work in progress to admit more."""
+
+
+class SingleFlight:
+    """Share one in-flight computation among concurrent identical calls."""
+
+    def __init__(self):
+        self.inflight: Dict[Hashable, asyncio.Future] = dict()
+
+    async def run(self, key: Hashable, fcn: Callable[[], Awaitable[T]]) -> T:
+        """Run fcn(), or join the call already in flight for key.
+
+        A caller that is cancelled does not cancel the shared computation.
+        """
+        future = self.inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fcn())
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+
+class AdmissionController:
+    """Limit concurrency, with a bounded queue of waiters.
+
+    Work beyond `max_concurrency` waits in a queue of at most `max_queue`
+    entries, for at most `queue_timeout` seconds. Anything else is
+    rejected immediately with Overloaded.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int,
+            max_queue: int,
+            queue_timeout: Optional[float] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        # created lazily so that it belongs to the serving event loop
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold one concurrency slot."""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.loop = loop
+        if not self.semaphore.locked():
+            # a free slot is taken without suspending
+            await self.semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            raise Overloaded("Queue is full")
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise Overloaded("Timed out in queue")
+            finally:
+                self.waiting -= 1
+        try:
+            yield
+        finally:
+            self.semaphore.release()
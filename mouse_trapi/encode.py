@@ -1,10 +1,25 @@
 """Encode query graph in English."""
+import asyncio
+import os
 import re
-from typing import Union
+from typing import Dict, Iterable, List, Optional, Union
 
 import httpx
 
-from .util import Triple, CURIETriple, Category, Name
+from .util import LRUCache, Triple, CURIETriple, Category, Name
+
+NODE_NORMALIZER_URL = os.environ.get(
+    "NODE_NORMALIZER_URL",
+    "https://nodenormalization-sri.renci.org/get_normalized_nodes",
+)
+# maximum number of CURIEs per node-normalizer request in encode_many()
+BATCH_SIZE = 500
+# maximum number of node-normalizer requests in flight in encode_many(),
+# which should not exceed the client's connection pool (100 by default)
+MAX_CONCURRENT_BATCHES = int(os.environ.get("MAX_CONCURRENT_BATCHES", 10))
+LABEL_CACHE_SIZE = int(os.environ.get("LABEL_CACHE_SIZE", 10_000))
+
+label_cache: LRUCache[str, Name] = LRUCache(LABEL_CACHE_SIZE)
 
 
 def pascalcase_to_sentencecase(string: str) -> str:
@@ -29,19 +44,88 @@ def english_triple_to_sentence(triple: Triple) -> str:
         return f"{triple.subject} {triple.predicate} what {triple.object}?"
 
 
+def category_curie_to_name(category: Category) -> Category:
+    """Convert category CURIE to name."""
+    return Category(pascalcase_to_sentencecase(
+        category.split(":")[1]
+    ))
+
+
 def sobject_curie_to_name(sobject: Union[Category, Name]) -> Union[Category, Name]:
     """Convert subject or object CURIE to name."""
     if isinstance(sobject, Category):
-        return Category(pascalcase_to_sentencecase(
-            sobject.split(":")[1]
-        ))
-    else:
+        return category_curie_to_name(sobject)
+    label = label_cache.get(sobject)
+    if label is None:
         response = httpx.get(
-            "https://nodenormalization-sri.renci.org/get_normalized_nodes",
+            NODE_NORMALIZER_URL,
             params={"curie": sobject},
         )
         response.raise_for_status()
-        return Name(response.json()[sobject]["id"]["label"])
+        label = Name(response.json()[sobject]["id"]["label"])
+        label_cache[sobject] = label
+    return label
+
+
+async def curies_to_names(
+        curies: Iterable[str],
+        client: httpx.AsyncClient,
+) -> Dict[str, Name]:
+    """Convert CURIEs to names in at most one node-normalizer request.
+
+    CURIEs unknown to the node normalizer are left out.
+    """
+    names = dict()
+    missing = []
+    for curie in dict.fromkeys(curies):
+        label = label_cache.get(curie)
+        if label is None:
+            missing.append(curie)
+        else:
+            names[curie] = label
+    if not missing:
+        return names
+    # POST keeps large batches out of the request line
+    response = await client.post(
+        NODE_NORMALIZER_URL,
+        json={"curies": missing},
+    )
+    response.raise_for_status()
+    results = response.json()
+    for curie in missing:
+        result = results.get(curie)
+        if not result:
+            continue
+        names[curie] = label_cache[curie] = Name(result["id"]["label"])
+    return names
+
+
+def resolved_sobject(
+        sobject: Union[Category, Name],
+        names: Dict[str, Name],
+) -> Union[Category, Name]:
+    """Convert subject or object CURIE to name, using pre-resolved names."""
+    if isinstance(sobject, Category):
+        return category_curie_to_name(sobject)
+    else:
+        return names[sobject]
+
+
+def curie_triple_to_triple(
+        curie_triple: CURIETriple,
+        names: Dict[str, Name],
+) -> Optional[Triple]:
+    """Convert CURIE triple to triple, using pre-resolved names.
+
+    Returns None if a name is missing.
+    """
+    if any(curie not in names for curie in curie_triple_names(curie_triple)):
+        return None
+    return Triple(
+        resolved_sobject(curie_triple.subject, names),
+        snakecase_to_sentencecase(curie_triple.predicate.split(":")[1]),
+        resolved_sobject(curie_triple.object, names),
+    )
 
 
 def curie_triple_to_sentence(curie_triple: CURIETriple) -> str:
@@ -55,8 +139,8 @@ def curie_triple_to_sentence(curie_triple: CURIETriple) -> str:
     return english_triple_to_sentence(triple)
 
 
-def encode(qgraph) -> str:
-    """Encode quergy graph."""
+def qgraph_to_curie_triple(qgraph) -> CURIETriple:
+    """Convert query graph to CURIE triple."""
     assert len(qgraph["nodes"]) == 2
     assert len(qgraph["edges"]) == 1
     edge = next(iter(qgraph["edges"].values()))
@@ -66,17 +150,101 @@ def encode(qgraph) -> str:
         assert object_qnode.get("id", None) is not None
         subject_category = subject_qnode.get("category", "biolink:NamedThing")
         object_id = object_qnode["id"]
-        return curie_triple_to_sentence(CURIETriple(
+        return CURIETriple(
             Category(subject_category),
             edge.get("predicate", "biolink:related_to"),
             Name(object_id),
-        ))
+        )
     else:
         assert object_qnode.get("id", None) is None
         subject_id = subject_qnode["id"]
         object_category = object_qnode.get("category", "biolink:NamedThing")
-        return curie_triple_to_sentence(CURIETriple(
+        return CURIETriple(
             Name(subject_id),
             edge.get("predicate", "biolink:related_to"),
             Category(object_category),
+        )
+
+
+def curie_triple_names(curie_triple: CURIETriple) -> List[Name]:
+    """Get the CURIEs in a CURIE triple that need a remote label lookup."""
+    return [
+        sobject
+        for sobject in (curie_triple.subject, curie_triple.object)
+        if not isinstance(sobject, Category)
+    ]
+
+
+def encode(qgraph) -> str:
+    """Encode quergy graph."""
+    return curie_triple_to_sentence(qgraph_to_curie_triple(qgraph))
+
+
+async def async_encode(
+        qgraph,
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: Optional[float] = None,
+) -> Optional[str]:
+    """Encode query graph, resolving labels asynchronously.
+
+    Subject and object labels are resolved together in one request.
+    Returns None if the node normalizer does not know a CURIE.
+    Pass a shared client to reuse its connection pool across calls.
+    `timeout` is a deadline in seconds for the whole call.
+    """
+    return (await encode_many([qgraph], client=client, timeout=timeout))[0]
+
+
+async def encode_many(
+        qgraphs: Iterable,
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: Optional[float] = None,
+        batch_size: int = BATCH_SIZE,
+        concurrency: int = MAX_CONCURRENT_BATCHES,
+) -> List[Optional[str]]:
+    """Encode query graphs, batching and parallelizing label lookups.
+
+    The CURIEs of all query graphs are deduplicated and resolved in
+    batches of `batch_size`, with at most `concurrency` batches in flight.
+    Keep `concurrency` within the client's connection pool, or batches
+    waiting for a connection may fail with httpx.PoolTimeout.
+    `timeout` is a deadline in seconds for the whole call. Query graphs
+    with a CURIE unknown to the node normalizer encode to None.
+    """
+    curie_triples = [qgraph_to_curie_triple(qgraph) for qgraph in qgraphs]
+    curies = list(dict.fromkeys(
+        curie
+        for curie_triple in curie_triples
+        for curie in curie_triple_names(curie_triple)
+    ))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve_batch(batch: List[str], client: httpx.AsyncClient) -> Dict[str, Name]:
+        async with semaphore:
+            return await curies_to_names(batch, client)
+
+    async def resolve(client: httpx.AsyncClient) -> Dict[str, Name]:
+        batches = await asyncio.gather(*(
+            resolve_batch(curies[idx:idx + batch_size], client)
+            for idx in range(0, len(curies), batch_size)
         ))
+        return {
+            curie: name
+            for batch in batches
+            for curie, name in batch.items()
+        }
+
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            names = await asyncio.wait_for(resolve(client), timeout)
+    else:
+        names = await asyncio.wait_for(resolve(client), timeout)
+    triples = [
+        curie_triple_to_triple(curie_triple, names)
+        for curie_triple in curie_triples
+    ]
+    return [
+        None if triple is None else english_triple_to_sentence(triple)
+        for triple in triples
+    ]
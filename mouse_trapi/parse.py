@@ -1,13 +1,25 @@
 """Parse question into query graph."""
+from contextvars import ContextVar
+from functools import lru_cache
 import json
+import os
 from pathlib import Path
 import re
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 import bmt
 import httpx
 
 from .util import *
 
+ROBOKOP_URL = os.environ.get("ROBOKOP_URL", "http://robokop.renci.org:2433/lookup")
+NAME_CACHE_SIZE = int(os.environ.get("NAME_CACHE_SIZE", 10_000))
+# number of best-scoring readings whose names are looked up in ambiguous mode
+MAX_NAME_LOOKUPS = max(1, int(os.environ.get("MAX_NAME_LOOKUPS", 3)))
+# how far below the best a reading may score and still be looked up in ambiguous mode
+FALLBACK_SCORE_MARGIN = float(os.environ.get("FALLBACK_SCORE_MARGIN", 1))
+
 toolkit = bmt.Toolkit()
 
 dir_path = Path(__file__).parent
@@ -66,11 +78,75 @@ expressions = [
 ]
 re_objs = [re.compile(exp) for exp in expressions]
 
+# token-level forms of the above, for classify_questions()
+what_tokens = {"what", "which"}
+find_tokens = [
+    ("what",), ("which",),
+    ("tell", "what"), ("tell", "which"),
+    ("tell", "me", "what"), ("tell", "me", "which"),
+    ("find",), ("find", "me"), ("find", "for", "me"),
+]
+# `does` only accepts "does "
+does_tokens = {"does"}
+# words that a name should not start or end with
+name_boundary_penalized = {"what", "which", "that", "me", "is", "are", "do", *does_tokens, *prepositions}
+
+
+def index_vocabulary(phrases: Iterable[str]) -> Dict[str, List[Tuple[str, ...]]]:
+    """Index tokenized phrases by first token, shortest first."""
+    index: Dict[str, List[Tuple[str, ...]]] = dict()
+    for phrase in sorted({tuple(phrase.split(" ")) for phrase in phrases}, key=len):
+        index.setdefault(phrase[0], []).append(phrase)
+    return index
+
+
+category_vocabulary = index_vocabulary(categories)
+predicate_vocabulary = index_vocabulary(predicates)
+
+# when set to a list, match_question() appends a TemplateAttempt per template tried
+template_attempts: ContextVar[Optional[List["TemplateAttempt"]]] = ContextVar(
+    "template_attempts",
+    default=None,
+)
+
 
 class ParseError(Exception):
     """Parse error."""
 
 
+class TemplateAttempt(NamedTuple):
+    template: int
+    seconds: float
+    matched: bool
+
+
+Span = Tuple[int, int]
+
+
+class Analysis(NamedTuple):
+    """Template and slot token spans for one reading of a question."""
+    template: int
+    category: Optional[Span]
+    predicate: Span
+    name: Span
+
+    def groupdict(self, tokens: List[str]) -> Dict[str, Optional[str]]:
+        """Get slots as the matching template's regex groups would."""
+        def text(span):
+            return None if span is None else " ".join(tokens[span[0]:span[1]])
+        if self.template == 0:
+            return {
+                "subject_category": text(self.category),
+                "predicate": text(self.predicate),
+                "object_name": text(self.name),
+            }
+        return {
+            "object_category": text(self.category),
+            "subject_name": text(self.name),
+            "predicate": text(self.predicate),
+        }
+
+
 def fix_predicate(predicate):
     """Convert predicate to biolink form."""
     predicate = singular_verb_cache.get(predicate, predicate)
@@ -85,6 +161,7 @@ def fix_category(category):
     return category
 
 
+@lru_cache(maxsize=None)
 def format(string):
     """Format as CURIE."""
     return toolkit._format_all_elements([string], formatted=True)[0]
@@ -109,16 +186,34 @@ def preprocess(question):
     return " ".join(words)
 
 
+def match_question(question: str) -> re.Match:
+    """Match preprocessed question against the first matching template."""
+    attempts = template_attempts.get()
+    for idx, re_obj in enumerate(re_objs):
+        if attempts is None:
+            match = re_obj.fullmatch(question)
+        else:
+            start = time.perf_counter()
+            match = re_obj.fullmatch(question)
+            attempts.append(TemplateAttempt(
+                idx,
+                time.perf_counter() - start,
+                match is not None,
+            ))
+        if match is not None:
+            return match
+    raise ParseError("Failed to parse")
+
+
 def sentence_to_triple(question: str) -> Triple:
     """Parse natural-language question."""
     question = preprocess(question)
-    for re_obj in re_objs:
-        match = re_obj.fullmatch(question)
-        if match is not None:
-            break
-    else:
-        raise ParseError("Failed to parse")
-    elements = match.groupdict()
+    match = match_question(question)
+    return elements_to_triple(match.groupdict())
+
+
+def elements_to_triple(elements: Dict[str, Optional[str]]) -> Triple:
+    """Convert template slots to triple."""
     if "object_name" in elements:
         predicate = fix_predicate(elements["predicate"])
         subject = Category(fix_category(elements["subject_category"] or "named thing"))
@@ -132,6 +227,147 @@ def sentence_to_triple(question: str) -> Triple:
     return Triple(subject, predicate, object)
 
 
+def vocabulary_spans(
+        tokens: List[str],
+        vocabulary: Dict[str, List[Tuple[str, ...]]],
+) -> List[List[int]]:
+    """Find the ends of all vocabulary phrases starting at each token."""
+    spans = [
+        [
+            start + len(phrase)
+            for phrase in vocabulary.get(token, ())
+            if tuple(tokens[start:start + len(phrase)]) == phrase
+        ]
+        for start, token in enumerate(tokens)
+    ]
+    spans.append([])
+    return spans
+
+
+def analyze(tokens: List[str]) -> List[Analysis]:
+    """Find all readings of a tokenized, preprocessed question."""
+    n = len(tokens)
+    category_ends = vocabulary_spans(tokens, category_vocabulary)
+    predicate_ends = vocabulary_spans(tokens, predicate_vocabulary)
+    analyses = []
+
+    # find [category [that]]
+    heads = []
+    for find in find_tokens:
+        f = len(find)
+        if tuple(tokens[:f]) != find:
+            continue
+        heads.append((None, f))
+        for c in category_ends[f]:
+            heads.append(((f, c), c))
+            if c < n and tokens[c] == "that":
+                heads.append(((f, c), c + 1))
+
+    for category, start in heads:
+        # template 0: ... predicate name
+        for end in predicate_ends[start]:
+            if end < n:
+                analyses.append(Analysis(0, category, (start, end), (end, n)))
+        # template 1: ... [does] name predicate
+        name_starts = [start]
+        if start < n and tokens[start] in does_tokens:
+            name_starts.append(start + 1)
+        for name_start in name_starts:
+            for p in range(name_start + 1, n):
+                if n in predicate_ends[p]:
+                    analyses.append(Analysis(1, category, (p, n), (name_start, p)))
+
+    # template 2: name predicate what [category]
+    for w in range(2, n):
+        if tokens[w] not in what_tokens:
+            continue
+        if w + 1 == n:
+            category = None
+        elif n in category_ends[w + 1]:
+            category = (w + 1, n)
+        else:
+            continue
+        for p in range(1, w):
+            if w in predicate_ends[p]:
+                analyses.append(Analysis(2, category, (p, w), (0, p)))
+    return analyses
+
+
+def classify_questions(questions: Iterable[str]) -> List[List[Analysis]]:
+    """Find all readings of each of many questions.
+
+    Questions are preprocessed and tokenized, and vocabulary phrases are
+    located with token-span dictionary lookups instead of the regexes.
+    """
+    return [
+        analyze(preprocess(question).split(" "))
+        for question in questions
+    ]
+
+
+def score_analysis(analysis: Analysis, tokens: List[str]) -> float:
+    """Score how plausible a reading is, higher being better.
+
+    Readings that cover more of the question with vocabulary phrases win.
+    Names that start or end with function words, or that contain a
+    predicate, lose. Ties go to the template order used by the regexes.
+    """
+    name = tokens[analysis.name[0]:analysis.name[1]]
+    score = analysis.predicate[1] - analysis.predicate[0]
+    if analysis.category is not None:
+        score += analysis.category[1] - analysis.category[0]
+    score -= 2 * (name[0] in name_boundary_penalized)
+    score -= 2 * (name[-1] in name_boundary_penalized)
+    predicate_ends = vocabulary_spans(name, predicate_vocabulary)
+    score -= any(predicate_ends[:-1])
+    return score - 0.01 * analysis.template
+
+
+def boundary_penalized(name: str) -> bool:
+    """Check whether name starts or ends with a function word."""
+    words = name.split(" ")
+    return words[0] in name_boundary_penalized or words[-1] in name_boundary_penalized
+
+
+def scored_triples(question: str) -> List[Tuple[float, Triple]]:
+    """Parse natural-language question into all scored readings, best first."""
+    tokens = preprocess(question).split(" ")
+    analyses = sorted(
+        (
+            (score_analysis(analysis, tokens), analysis)
+            for analysis in analyze(tokens)
+        ),
+        key=lambda scored: scored[0],
+        reverse=True,
+    )
+    triples = dict()
+    for score, analysis in analyses:
+        triple = elements_to_triple(analysis.groupdict(tokens))
+        # Category and Name compare equal as strings, so key on which is which
+        triples.setdefault((isinstance(triple.subject, Category), triple), (score, triple))
+    return list(triples.values())
+
+
+def ranked_triples(question: str) -> List[Triple]:
+    """Parse natural-language question into all readings, best first."""
+    return [triple for _, triple in scored_triples(question)]
+
+
+def sentences_to_triples(questions: Iterable[str]) -> List[Optional[Triple]]:
+    """Parse many questions, or None for each that fails to parse.
+
+    The regexes are faster than classify_questions() at picking one
+    reading, so each question is matched as in sentence_to_triple().
+    """
+    triples = []
+    for question in questions:
+        try:
+            triples.append(sentence_to_triple(question))
+        except ParseError:
+            triples.append(None)
+    return triples
+
+
 def sentence_to_curie_triple(question):
     """Convert sentence to CURIE triple."""
     return triple_to_curie_triple(sentence_to_triple(question))
@@ -147,15 +383,24 @@ def predicate_to_curie(predicate: str) -> str:
     return format(predicate)
 
 
+name_cache: LRUCache[str, Name] = LRUCache(NAME_CACHE_SIZE)
+
+
 def name_to_curie(name: Name) -> Name:
     """Convert name to CURIE."""
+    curie = name_cache.get(name)
+    if curie is not None:
+        return curie
     response = httpx.post(
-        "http://robokop.renci.org:2433/lookup",
+        ROBOKOP_URL,
         params={"string": name, "limit":10},
     )
-    if not response:
+    response.raise_for_status()
+    if not response.json():
         raise ParseError(f"Unrecognized thing '{name}'")
-    return Name(next(iter(response.json())))
+    curie = Name(next(iter(response.json())))
+    name_cache[name] = curie
+    return curie
 
 
 def sobject_to_curie(sobject: Union[Category, Name]) -> Union[Category, Name]:
@@ -209,10 +454,46 @@ def curie_triple_to_qgraph(
     }
 
 
-def parse_question(question: str):
-    """Parse natural-language question."""
-    triple = sentence_to_triple(question)
-    curie_triple = triple_to_curie_triple(triple)
+def best_curie_triple(question: str) -> Tuple[Triple, CURIETriple]:
+    """Convert the best-scoring reading whose names resolve to CURIE triple.
+
+    If the best reading's name is unrecognized, fall back to the next
+    readings scoring within FALLBACK_SCORE_MARGIN of it, except those whose
+    names start or end with function words, looking up at most
+    MAX_NAME_LOOKUPS readings in all. Lookups that fail, rather than find
+    nothing, raise without falling back.
+    """
+    readings = scored_triples(question)
+    if not readings:
+        raise ParseError("Failed to parse")
+    best_score, best = readings[0]
+    fallbacks = [
+        triple
+        for score, triple in readings[1:]
+        if score >= best_score - FALLBACK_SCORE_MARGIN
+        and not boundary_penalized(
+            triple.object if isinstance(triple.subject, Category) else triple.subject
+        )
+    ]
+    for triple in [best, *fallbacks][:MAX_NAME_LOOKUPS]:
+        try:
+            return triple, triple_to_curie_triple(triple)
+        except ParseError as err:
+            error = err
+    raise error
+
+
+def parse_question(question: str, ambiguous: bool = False):
+    """Parse natural-language question.
+
+    If ambiguous, consider every reading of the question rather than the
+    first template match.
+    """
+    if ambiguous:
+        triple, curie_triple = best_curie_triple(question)
+    else:
+        triple = sentence_to_triple(question)
+        curie_triple = triple_to_curie_triple(triple)
     return curie_triple_to_qgraph(
         curie_triple,
         subject_key=triple.subject,
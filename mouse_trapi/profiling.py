@@ -0,0 +1,137 @@
+"""Opt-in request profiling.
+
+Enabled by setting either of
+
+* PROFILE_SAMPLE_RATE: fraction of requests to run under cProfile
+* PROFILE_THRESHOLD_MS: log every request slower than this
+
+Logged requests are written as JSON lines to the rotating log PROFILE_LOG,
+with the time spent on each template in `re_objs`. Sampled requests also
+include the top of their CPU profile. Requests parsed in ambiguous mode
+match no regexes, so they are logged with an empty "templates" list and
+only the profile shows where their time went. Replay a log offline with
+
+    python -m mouse_trapi.profiling slow_questions.log
+"""
+import cProfile
+import io
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, TypeVar
+
+from .parse import match_question, preprocess, template_attempts, ParseError, TemplateAttempt
+
+T = TypeVar('T')
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_THRESHOLD_MS = (
+    float(os.environ["PROFILE_THRESHOLD_MS"])
+    if os.environ.get("PROFILE_THRESHOLD_MS") else None
+)
+PROFILE_LOG = os.environ.get("PROFILE_LOG", "slow_questions.log")
+PROFILE_LOG_BYTES = int(os.environ.get("PROFILE_LOG_BYTES", 10_000_000))
+PROFILE_LOG_BACKUPS = int(os.environ.get("PROFILE_LOG_BACKUPS", 5))
+# number of functions kept from each CPU profile
+PROFILE_TOP = 30
+
+enabled = PROFILE_SAMPLE_RATE > 0 or PROFILE_THRESHOLD_MS is not None
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.propagate = False
+if enabled:
+    LOGGER.setLevel(logging.INFO)
+    LOGGER.addHandler(RotatingFileHandler(
+        PROFILE_LOG,
+        maxBytes=PROFILE_LOG_BYTES,
+        backupCount=PROFILE_LOG_BACKUPS,
+    ))
+
+# only one cProfile profiler can be active at a time in newer Pythons
+profiler_lock = threading.Lock()
+
+
+def attempts_to_json(attempts: List[TemplateAttempt]) -> List[Dict]:
+    """Convert template attempts to JSON."""
+    return [
+        {
+            "template": attempt.template,
+            "ms": 1000 * attempt.seconds,
+            "matched": attempt.matched,
+        }
+        for attempt in attempts
+    ]
+
+
+def profile_summary(profile: cProfile.Profile) -> str:
+    """Summarize CPU profile by cumulative time."""
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return stream.getvalue()
+
+
+def profiled(fcn: Callable[[str], T], question: str) -> T:
+    """Call fcn(question), profiling and logging it if configured."""
+    if not enabled:
+        return fcn(question)
+    attempts = []
+    token = template_attempts.set(attempts)
+    profile = None
+    if random.random() < PROFILE_SAMPLE_RATE and profiler_lock.acquire(blocking=False):
+        profile = cProfile.Profile()
+    outcome = "ok"
+    start = time.perf_counter()
+    try:
+        if profile is None:
+            return fcn(question)
+        return profile.runcall(fcn, question)
+    except Exception as err:
+        outcome = type(err).__name__
+        raise
+    finally:
+        elapsed_ms = 1000 * (time.perf_counter() - start)
+        template_attempts.reset(token)
+        if profile is not None:
+            profiler_lock.release()
+        if profile is not None or (
+                PROFILE_THRESHOLD_MS is not None
+                and elapsed_ms > PROFILE_THRESHOLD_MS
+        ):
+            LOGGER.info(json.dumps({
+                "question": question,
+                "preprocessed": preprocess(question),
+                "ms": elapsed_ms,
+                "outcome": outcome,
+                "templates": attempts_to_json(attempts),
+                "profile": profile_summary(profile) if profile is not None else None,
+            }))
+
+
+def replay(question: str) -> List[TemplateAttempt]:
+    """Time template matching for question."""
+    attempts = []
+    token = template_attempts.set(attempts)
+    try:
+        match_question(preprocess(question))
+    except ParseError:
+        pass
+    finally:
+        template_attempts.reset(token)
+    return attempts
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        with open(path, "r") as stream:
+            for line in stream:
+                question = json.loads(line)["question"]
+                print(json.dumps({
+                    "question": question,
+                    "templates": attempts_to_json(replay(question)),
+                }))
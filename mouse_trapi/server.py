@@ -1,20 +1,96 @@
 """FastAPI server."""
-from fastapi import Body, FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+import os
+
+from fastapi import Body, FastAPI, HTTPException, Query, Response
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from .concurrency import AdmissionController, Overloaded, SingleFlight
+from .parse import parse_question, preprocess, ParseError
+from .profiling import profiled
+from . import warmup
+
+MAX_CONCURRENT_QUESTIONS = int(os.environ.get("MAX_CONCURRENT_QUESTIONS", 40))
+MAX_QUEUED_QUESTIONS = int(os.environ.get("MAX_QUEUED_QUESTIONS", 100))
+QUEUE_TIMEOUT = float(os.environ.get("QUEUE_TIMEOUT", 10))
+RETRY_AFTER = int(os.environ.get("RETRY_AFTER", 1))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up lookup caches in the background, and save recent names at shutdown."""
+    task = asyncio.create_task(warmup.warm_up())
+    yield
+    task.cancel()
+    warmup.save_recent_names()
 
-from .parse import parse_question, ParseError
 
 app = FastAPI(
     title="Mouse-TRAPI",
     version="1.0.0",
+    lifespan=lifespan,
+)
+
+singleflight = SingleFlight()
+admission = AdmissionController(
+    MAX_CONCURRENT_QUESTIONS,
+    MAX_QUEUED_QUESTIONS,
+    QUEUE_TIMEOUT,
 )
 
 
+@app.get("/health")
+def health():
+    """Report health and warm-up progress."""
+    return {"status": "ok", "warmup": warmup.progress.to_json()}
+
+
+@app.get("/health/warm")
+def health_warm(response: Response):
+    """Report warm-up progress, with status 503 until warm-up is over.
+
+    Degraded and failed warm-ups are over too: the caches are best effort,
+    and names missing from them are looked up as questions arrive.
+    """
+    if warmup.progress.state in ("pending", "warming"):
+        response.status_code = 503
+    return warmup.progress.to_json()
+
+
+async def admitted_parse_question(question: str, ambiguous: bool):
+    """Parse question once a concurrency slot is free."""
+    async with admission.admit():
+        return await run_in_threadpool(
+            profiled,
+            partial(parse_question, ambiguous=ambiguous),
+            question,
+        )
+
+
 @app.post("/to_trapi")
-def to_trapi(
+async def to_trapi(
         question: str = Body(..., example="What drugs treat asthma?"),
+        ambiguous: bool = Query(False, description="consider every reading of the question"),
 ):
-    """Convert English to TRAPI."""
+    """Convert English to TRAPI.
+
+    Concurrent questions that preprocess to the same text share one parse.
+    """
     try:
-        return parse_question(question)
+        return await singleflight.run(
+            (ambiguous, preprocess(question)),
+            lambda: admitted_parse_question(question, ambiguous),
+        )
     except ParseError as err:
         raise HTTPException(status_code=400, detail=str(err))
+    except httpx.HTTPError as err:
+        raise HTTPException(status_code=502, detail=f"Lookup failed: {err}")
+    except Overloaded as err:
+        raise HTTPException(
+            status_code=503,
+            detail=str(err),
+            headers={"Retry-After": str(RETRY_AFTER)},
+        )
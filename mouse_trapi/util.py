@@ -1,8 +1,10 @@
 """Utilities."""
+from collections import OrderedDict
 from collections.abc import Callable
 from functools import wraps
 import re
-from typing import Dict, List, NamedTuple, TypeVar, Union
+from threading import Lock
+from typing import Dict, Generic, List, NamedTuple, Optional, TypeVar, Union
 
 prepositions = [
     "to",
@@ -37,6 +39,47 @@ class CURIETriple(NamedTuple):
 
 
 T = TypeVar('T')
+K = TypeVar('K')
+
+
+class LRUCache(Generic[K, T]):
+    """Thread-safe least-recently-used cache."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data: OrderedDict = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: K, default: Optional[T] = None) -> Optional[T]:
+        """Get value, marking it as recently used."""
+        with self.lock:
+            if key not in self.data:
+                return default
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def __setitem__(self, key: K, value: T):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def clear(self):
+        """Remove everything."""
+        with self.lock:
+            self.data.clear()
+
+    def keys(self) -> List[K]:
+        """Get keys, least recently used first."""
+        with self.lock:
+            return list(self.data.keys())
 
 
 def find_last(list_: List[T], element: T) -> int:
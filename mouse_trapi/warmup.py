@@ -0,0 +1,173 @@
+"""Warm up lookup caches at startup.
+
+Names are read from the files HOT_NAMES (hand-curated) and RECENT_NAMES
+(the name cache, saved at the previous shutdown), one per line. They are
+resolved to CURIEs and labels with at most WARMUP_CONCURRENCY lookups in
+flight, after the vocabulary has been formatted as CURIEs.
+
+Warm-up ends "warm", or "degraded" if most lookups failed, or "failed" if
+it raised. Degraded and failed warm-ups are retried up to WARMUP_RETRIES
+times, WARMUP_BACKOFF seconds after the first try and twice as long after
+each retry, before settling on that state.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from .encode import curies_to_names, BATCH_SIZE
+from .parse import (
+    categories, predicates, fix_category, fix_predicate,
+    category_to_curie, predicate_to_curie, name_to_curie, name_cache,
+)
+from .util import Name
+
+HOT_NAMES = os.environ.get("HOT_NAMES", None)
+RECENT_NAMES = os.environ.get("RECENT_NAMES", None)
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", 8))
+WARMUP_RETRIES = max(0, int(os.environ.get("WARMUP_RETRIES", 3)))
+WARMUP_BACKOFF = float(os.environ.get("WARMUP_BACKOFF", 1))
+# warm-up is degraded if more than this fraction of lookups fail
+DEGRADED_FAILURE_FRACTION = 0.5
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WarmUpProgress:
+    """Warm-up progress."""
+
+    def __init__(self):
+        self.state = "pending"
+        self.attempts = 0
+        self.reset()
+
+    def reset(self):
+        """Reset counts."""
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+
+    def to_json(self) -> Dict:
+        """Convert to JSON."""
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+        }
+
+
+progress = WarmUpProgress()
+
+
+def read_names(path: Optional[str]) -> List[Name]:
+    """Read names, one per line, if the file exists."""
+    if path is None or not os.path.exists(path):
+        return []
+    with open(path, "r") as stream:
+        return [Name(line.strip()) for line in stream if line.strip()]
+
+
+def save_recent_names(path: Optional[str] = RECENT_NAMES):
+    """Save the names in the name cache, least recently used first.
+
+    The file is replaced atomically, so workers shutting down together
+    never leave it half-written.
+    """
+    if path is None:
+        return
+    with tempfile.NamedTemporaryFile(
+            "w",
+            dir=os.path.dirname(os.path.abspath(path)),
+            delete=False,
+    ) as stream:
+        stream.writelines(f"{name}\n" for name in name_cache.keys())
+    os.replace(stream.name, path)
+
+
+def warm_vocabulary():
+    """Format all categories and predicates as CURIEs."""
+    for category in categories:
+        category_to_curie(fix_category(category))
+    for predicate in predicates:
+        predicate_to_curie(fix_predicate(predicate))
+
+
+async def warm_up(
+        names: Optional[List[Name]] = None,
+        concurrency: int = WARMUP_CONCURRENCY,
+        retries: int = WARMUP_RETRIES,
+        backoff: float = WARMUP_BACKOFF,
+):
+    """Fill the lookup caches, recording progress.
+
+    The state stays "warming" until the last attempt.
+    """
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+        progress.attempts = attempt + 1
+        try:
+            await fill_caches(names, concurrency)
+        except Exception:
+            state = "failed"
+            LOGGER.exception("Warm-up attempt %d failed", progress.attempts)
+            continue
+        if progress.failed <= DEGRADED_FAILURE_FRACTION * progress.total:
+            state = "warm"
+            LOGGER.info("Warm-up finished: %s", progress.to_json())
+            break
+        state = "degraded"
+        LOGGER.warning("Warm-up attempt %d degraded: %s", progress.attempts, progress.to_json())
+    progress.state = state
+
+
+async def fill_caches(names: Optional[List[Name]], concurrency: int):
+    """Fill the lookup caches."""
+    if names is None:
+        names = read_names(HOT_NAMES) + read_names(RECENT_NAMES)
+    names = list(dict.fromkeys(names))
+    progress.reset()
+    progress.state = "warming"
+    progress.total = 2 * len(names)
+    await run_in_threadpool(warm_vocabulary)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    curies = []
+
+    async def warm_name(name: Name):
+        async with semaphore:
+            try:
+                curies.append(await run_in_threadpool(name_to_curie, name))
+            except Exception as err:  # warm-up is best effort
+                LOGGER.warning("Warm-up failed to look up name '%s': %r", name, err)
+                progress.failed += 1
+            progress.done += 1
+
+    await asyncio.gather(*(warm_name(name) for name in names))
+    # names that failed have no label to fetch, which counts as failing too
+    progress.done += len(names) - len(curies)
+    progress.failed += len(names) - len(curies)
+
+    async def warm_labels(batch: List[str], client: httpx.AsyncClient):
+        async with semaphore:
+            try:
+                unknown = len(batch) - len(await curies_to_names(batch, client))
+                if unknown:
+                    LOGGER.warning("Warm-up found no labels for %d CURIEs", unknown)
+                progress.failed += unknown
+            except Exception as err:
+                LOGGER.warning("Warm-up failed to look up %d labels: %r", len(batch), err)
+                progress.failed += len(batch)
+            progress.done += len(batch)
+
+    async with httpx.AsyncClient() as client:
+        await asyncio.gather(*(
+            warm_labels(curies[idx:idx + BATCH_SIZE], client)
+            for idx in range(0, len(curies), BATCH_SIZE)
+        ))
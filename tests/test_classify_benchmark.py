@@ -0,0 +1,20 @@
+"""Test parsing benchmark."""
+import json
+
+from benchmarks.classify_benchmark import main, questions
+from mouse_trapi.parse import classify_questions
+
+
+def test_questions():
+    """Test that generated questions all parse."""
+    assert all(classify_questions(questions(30)))
+
+
+def test_main(tmp_path):
+    """Test running the benchmark."""
+    output = tmp_path / "results.json"
+    assert main(["--questions", "30", "--repeat", "1", "--output", str(output)]) == 0
+    with open(output, "r") as stream:
+        results = json.load(stream)
+    assert results["questions"] == 30
+    assert results["sentence_to_triple"] > 0
@@ -0,0 +1,59 @@
+"""Test concurrency control."""
+import asyncio
+
+import pytest
+
+from mouse_trapi.concurrency import AdmissionController, Overloaded, SingleFlight
+
+
+def test_singleflight():
+    """Test that concurrent identical calls share one computation."""
+    singleflight = SingleFlight()
+    calls = []
+
+    async def compute(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def run():
+        return await asyncio.gather(*(
+            singleflight.run(key, lambda key=key: compute(key))
+            for key in ["a", "a", "b", "a"]
+        ))
+
+    assert asyncio.run(run()) == ["A", "A", "B", "A"]
+    assert calls == ["a", "b"]
+    assert singleflight.inflight == {}
+
+
+def test_admission_control():
+    """Test that work beyond the queue is rejected."""
+    admission = AdmissionController(max_concurrency=1, max_queue=1)
+
+    async def work():
+        async with admission.admit():
+            await asyncio.sleep(0.01)
+
+    async def run():
+        return await asyncio.gather(
+            *(work() for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert results[:2] == [None, None]
+    assert isinstance(results[2], Overloaded)
+
+
+def test_admission_timeout():
+    """Test that waiting too long in the queue is rejected."""
+    admission = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=0.01)
+
+    async def run():
+        async with admission.admit():
+            with pytest.raises(Overloaded):
+                async with admission.admit():
+                    pass
+
+    asyncio.run(run())
@@ -1,5 +1,16 @@
 """Test encoder."""
-from mouse_trapi.encode import encode, pascalcase_to_sentencecase, snakecase_to_sentencecase
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from benchmarks.load_test import start_stub
+from mouse_trapi import encode as encode_module
+from mouse_trapi.encode import (
+    async_encode, encode, encode_many, label_cache,
+    pascalcase_to_sentencecase, snakecase_to_sentencecase,
+)
 
 
 def test_convert_casing():
@@ -43,3 +54,107 @@ def test_encode():
             }
         }
     }) == "Albuterol is related to what diseases?"
+
+
+def normalizer_handler(requests, delay=0):
+    """Build a mock node normalizer recording its requests."""
+    labels = {
+        "HP:0005978": "Type 2 diabetes mellitus",
+        "CHEBI:2549": "Albuterol",
+    }
+
+    async def handler(request):
+        """Respond like the node normalizer."""
+        requests.append(request)
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={
+            curie: (
+                {"id": {"identifier": curie, "label": labels[curie]}}
+                if curie in labels else None
+            )
+            for curie in json.loads(request.content)["curies"]
+        })
+
+    return handler
+
+
+def qgraph(subject, object):
+    """Build one-hop query graph."""
+    return {
+        "nodes": {"s": subject, "o": object},
+        "edges": {
+            "treats": {
+                "subject": "s",
+                "predicate": "biolink:treats",
+                "object": "o",
+            }
+        },
+    }
+
+
+def test_encode_many():
+    """Test batched encoding."""
+    label_cache.clear()
+    requests = []
+
+    async def run():
+        transport = httpx.MockTransport(normalizer_handler(requests))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await encode_many([
+                qgraph({"category": "biolink:Drug"}, {"id": "HP:0005978"}),
+                qgraph({"id": "CHEBI:2549"}, {"category": "biolink:Disease"}),
+                qgraph({"id": "FAKE:0"}, {"category": "biolink:Disease"}),
+            ], client=client)
+
+    assert asyncio.run(run()) == [
+        "What drug treats Type 2 diabetes mellitus?",
+        "Albuterol treats what disease?",
+        None,
+    ]
+    assert len(requests) == 1
+    assert requests[0].method == "POST"
+
+
+def test_async_encode():
+    """Test async encoding, with and without a deadline."""
+    label_cache.clear()
+    requests = []
+
+    async def run(timeout):
+        transport = httpx.MockTransport(normalizer_handler(requests, delay=0.05))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await async_encode(
+                qgraph({"id": "CHEBI:2549"}, {"category": "biolink:Disease"}),
+                client=client,
+                timeout=timeout,
+            )
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run(timeout=0.01))
+    assert asyncio.run(run(timeout=1)) == "Albuterol treats what disease?"
+
+
+def test_encode_many_concurrency(monkeypatch):
+    """Test that more batches than pool connections do not time out."""
+    label_cache.clear()
+    monkeypatch.setattr(
+        encode_module,
+        "NODE_NORMALIZER_URL",
+        f"{start_stub(0.5)}/get_normalized_nodes",
+    )
+    qgraphs = [
+        qgraph({"id": f"FAKE:{idx}"}, {"category": "biolink:Disease"})
+        for idx in range(4)
+    ]
+
+    async def run():
+        async with httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=2),
+                timeout=httpx.Timeout(5, pool=0.1),
+        ) as client:
+            return await encode_many(qgraphs, client=client, batch_size=1, concurrency=2)
+
+    assert asyncio.run(run()) == [
+        f"FAKE:{idx} treats what disease?"
+        for idx in range(4)
+    ]
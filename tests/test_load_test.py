@@ -0,0 +1,66 @@
+"""Test load-test harness."""
+from argparse import Namespace
+import math
+
+from fastapi.testclient import TestClient
+
+from benchmarks.load_test import check_budgets, histogram, percentile, stub_app, summarize
+
+
+def test_percentile():
+    """Test percentile()."""
+    values = list(range(100))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1.0) == 99
+    assert math.isnan(percentile([], 0.99))
+
+
+def test_histogram():
+    """Test histogram()."""
+    counts = histogram([0.5, 1, 3, 7000])
+    assert counts["<=1ms"] == 2
+    assert counts["<=5ms"] == 1
+    assert counts["<=infms"] == 1
+    assert sum(counts.values()) == 4
+
+
+def budgets(p99_budget_ms=None, error_rate_budget=None, memory_budget_mb=None):
+    """Build budget arguments."""
+    return Namespace(
+        p99_budget_ms=p99_budget_ms,
+        error_rate_budget=error_rate_budget,
+        memory_budget_mb=memory_budget_mb,
+    )
+
+
+def test_summarize():
+    """Test summarize()."""
+    responses = [(200, 100.0)] * 2 + [(400, 10.0)] + [(503, 1.0)] * 7
+    result = summarize(responses, 1.0, [50.0, 80.0, 60.0])
+    assert result["error_rate"] == 0.7
+    assert result["statuses"] == {200: 2, 400: 1, 503: 7}
+    assert result["p99_served_ms"] == 100.0
+    assert result["p50_ms"] == 1.0
+    assert (result["rss_start_mb"], result["rss_peak_mb"], result["rss_end_mb"]) == (50, 80, 60)
+
+
+def test_check_budgets():
+    """Test check_budgets()."""
+    result = {"p99_served_ms": 600, "error_rate": 0.7, "rss_peak_mb": 100}
+    assert check_budgets(result, budgets()) == []
+    assert check_budgets(result, budgets(1000, 0.8, 200)) == []
+    assert len(check_budgets(result, budgets(500, 0.01, 50))) == 3
+    # nothing served fails the latency budget
+    result["p99_served_ms"] = float("nan")
+    assert len(check_budgets(result, budgets(p99_budget_ms=1000))) == 1
+
+
+def test_stub_normalizer():
+    """Test stub node normalizer."""
+    client = TestClient(stub_app(0))
+    response = client.get("/get_normalized_nodes", params={"curie": ["A:1", "B:2"]})
+    assert response.status_code == 200
+    assert set(response.json()) == {"A:1", "B:2"}
+    response = client.post("/get_normalized_nodes", json={"curies": ["A:1"]})
+    assert response.json()["A:1"]["id"]["label"] == "A:1"
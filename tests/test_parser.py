@@ -1,5 +1,13 @@
 """Test parser."""
-from mouse_trapi.parse import parse_question, preprocess, format
+import httpx
+import pytest
+
+from mouse_trapi import parse
+from mouse_trapi.parse import (
+    classify_questions, parse_question, preprocess, format, sentence_to_triple,
+    ranked_triples, sentences_to_triples, Analysis, ParseError,
+)
+from mouse_trapi.util import Category, Name, Triple
 
 
 def test_preprocess():
@@ -270,3 +278,91 @@ def test_format():
     """Test format()."""
     assert format("treats") == "biolink:treats"
     assert format("chemical substance") == "biolink:ChemicalSubstance"
+
+
+def test_classify_questions():
+    """Test batch classification."""
+    assert classify_questions([
+        "What drugs treat asthma?",
+        "Asthma is treated by which chemical substance?",
+        "What aaagggh?",
+        "What diseases do albuterol treat?",
+    ]) == [
+        [Analysis(0, (1, 2), (2, 3), (3, 4))],
+        [Analysis(2, (5, 7), (1, 4), (0, 1))],
+        [],
+        [
+            Analysis(1, None, (4, 5), (1, 4)),
+            Analysis(1, (1, 2), (4, 5), (2, 4)),
+        ],  # like the regex, "do" is not skipped
+    ]
+
+
+def test_sentences_to_triples():
+    """Test batch parsing."""
+    questions = [
+        "What drugs treat asthma?",
+        "What disease does albuterol treat?",
+        "Asthma is treated by which chemical substance?",
+        "What aaagggh?",
+    ]
+    assert sentences_to_triples(questions) == [
+        sentence_to_triple(question)
+        for question in questions[:3]
+    ] + [None]
+
+
+def test_ambiguous_readings():
+    """Test ranking all readings of a question."""
+    triples = ranked_triples("What disease does albuterol treat?")
+    assert triples[0] == Triple(Name("albuterol"), "treats", Category("disease"))
+    assert Triple(Name("does albuterol"), "treats", Category("disease")) in triples[1:]
+    assert ranked_triples("What aaagggh?") == []
+    assert parse_question("What disease does albuterol treat?", ambiguous=True) == \
+        parse_question("What disease does albuterol treat?")
+
+
+def mock_lookup(monkeypatch, lookups, known=(), status_code=200):
+    """Mock name lookup that records names and only knows some of them."""
+    def post(url, params):
+        lookups.append(params["string"])
+        return httpx.Response(
+            status_code,
+            json={"CHEBI:2549": ["albuterol"]} if params["string"] in known else {},
+            request=httpx.Request("POST", url),
+        )
+
+    monkeypatch.setattr(parse.httpx, "post", post)
+    parse.name_cache.clear()
+
+
+def test_ambiguous_fallback(monkeypatch):
+    """Test falling back to the next reading when a name does not resolve."""
+    question = "What disease does albuterol treat?"
+    best, second = [triple.subject for triple in ranked_triples(question)[:2]]
+    lookups = []
+    mock_lookup(monkeypatch, lookups, known={second})
+    qgraph = parse_question(question, ambiguous=True)
+    assert lookups == [best, second]
+    assert qgraph["nodes"][second] == {"id": "CHEBI:2549"}
+
+
+def test_ambiguous_fallback_penalized(monkeypatch):
+    """Test not falling back to readings with function words at the name boundary."""
+    question = "What disease does albuterol treat?"
+    assert Triple(Name("does albuterol"), "treats", Category("disease")) in ranked_triples(question)
+    lookups = []
+    mock_lookup(monkeypatch, lookups)
+    with pytest.raises(ParseError):
+        parse_question(question, ambiguous=True)
+    assert lookups[0] == "albuterol"
+    assert "does albuterol" not in lookups
+
+
+def test_lookup_error(monkeypatch):
+    """Test that failed lookups raise, without falling back."""
+    lookups = []
+    mock_lookup(monkeypatch, lookups, status_code=503)
+    with pytest.raises(httpx.HTTPStatusError):
+        parse_question("What disease does albuterol treat?", ambiguous=True)
+    assert lookups == ["albuterol"]
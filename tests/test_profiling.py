@@ -0,0 +1,75 @@
+"""Test profiling."""
+import json
+import logging
+
+import pytest
+
+from mouse_trapi import profiling
+from mouse_trapi.parse import ParseError, sentence_to_triple
+from mouse_trapi.profiling import profiled, replay
+
+
+class ListHandler(logging.Handler):
+    """Collect log messages."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def profile_log(monkeypatch):
+    """Enable profiling, capturing the log."""
+    handler = ListHandler()
+    monkeypatch.setattr(profiling, "enabled", True)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(profiling, "PROFILE_THRESHOLD_MS", None)
+    monkeypatch.setattr(profiling.LOGGER, "level", logging.INFO)
+    monkeypatch.setattr(profiling.LOGGER, "handlers", [handler])
+    return handler.messages
+
+
+def test_replay():
+    """Test timing template matches."""
+    attempts = replay("Asthma is treated by which chemical substance?")
+    assert [attempt.template for attempt in attempts] == [0, 1, 2]
+    assert [attempt.matched for attempt in attempts] == [False, False, True]
+    attempts = replay("What aaagggh?")
+    assert not any(attempt.matched for attempt in attempts)
+
+
+def test_profiled_sampled(monkeypatch, profile_log):
+    """Test that sampled requests are logged with a CPU profile."""
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1)
+    question = "Asthma is treated by which chemical substance?"
+    assert profiled(sentence_to_triple, question) == sentence_to_triple(question)
+    record = json.loads(profile_log[0])
+    assert record["question"] == question
+    assert record["outcome"] == "ok"
+    assert [attempt["matched"] for attempt in record["templates"]] == [False, False, True]
+    assert "sentence_to_triple" in record["profile"]
+    assert not profiling.profiler_lock.locked()
+
+
+def test_profiled_threshold(monkeypatch, profile_log):
+    """Test that slow requests are logged, without a profile."""
+    monkeypatch.setattr(profiling, "PROFILE_THRESHOLD_MS", 1e6)
+    profiled(sentence_to_triple, "What drugs treat asthma?")
+    assert profile_log == []
+    monkeypatch.setattr(profiling, "PROFILE_THRESHOLD_MS", 0)
+    profiled(sentence_to_triple, "What drugs treat asthma?")
+    record = json.loads(profile_log[0])
+    assert record["profile"] is None
+    assert record["templates"][0]["matched"]
+
+
+def test_profiled_error(monkeypatch, profile_log):
+    """Test that failures are logged and release the profiler."""
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1)
+    with pytest.raises(ParseError):
+        profiled(sentence_to_triple, "What aaagggh?")
+    assert json.loads(profile_log[0])["outcome"] == "ParseError"
+    assert not profiling.profiler_lock.locked()
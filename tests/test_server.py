@@ -0,0 +1,70 @@
+"""Test server."""
+import asyncio
+import time
+
+import httpx
+
+from mouse_trapi import server
+from mouse_trapi.concurrency import AdmissionController
+
+
+def slow_parse_question(calls):
+    """Build a slow stand-in for parse_question() that records its calls."""
+    def parse_question(question, ambiguous=False):
+        calls.append(question)
+        time.sleep(0.1)
+        return {"question": question}
+    return parse_question
+
+
+async def post_all(questions):
+    """Post questions concurrently."""
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(
+            client.post("/to_trapi", json=question)
+            for question in questions
+        ))
+
+
+def test_coalescing(monkeypatch):
+    """Test that concurrent identical questions share one parse."""
+    calls = []
+    monkeypatch.setattr(server, "parse_question", slow_parse_question(calls))
+    responses = asyncio.run(post_all([
+        "What drugs treat asthma?",
+        "what drugs treat asthma",
+        "What drugs treat asthma, please?",
+    ]))
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len(calls) == 1
+
+
+def test_overload(monkeypatch):
+    """Test that overload is rejected with Retry-After."""
+    calls = []
+    monkeypatch.setattr(server, "parse_question", slow_parse_question(calls))
+    monkeypatch.setattr(server, "admission", AdmissionController(1, 0))
+    responses = asyncio.run(post_all([
+        "What drugs treat asthma?",
+        "What drugs treat diabetes?",
+    ]))
+    assert sorted(response.status_code for response in responses) == [200, 503]
+    rejected = next(response for response in responses if response.status_code == 503)
+    assert rejected.headers["Retry-After"] == str(server.RETRY_AFTER)
+    assert len(calls) == 1
+
+
+def test_lookup_error(monkeypatch):
+    """Test that failed lookups are a bad gateway, not a bad request."""
+    def parse_question(question, ambiguous=False):
+        request = httpx.Request("POST", "http://robokop")
+        raise httpx.HTTPStatusError(
+            "Server error",
+            request=request,
+            response=httpx.Response(503, request=request),
+        )
+
+    monkeypatch.setattr(server, "parse_question", parse_question)
+    responses = asyncio.run(post_all(["What drugs treat asthma?"]))
+    assert responses[0].status_code == 502
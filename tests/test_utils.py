@@ -1,7 +1,7 @@
 """Test utilities."""
 from mouse_trapi.util import (
     find_last, find_last_matching, plural_noun_phrase, plural_verb_phrase,
-    singular_noun_cache, singular_verb_cache,
+    singular_noun_cache, singular_verb_cache, LRUCache,
 )
 
 
@@ -26,3 +26,15 @@ def test_plural_noun_phrase():
     """Test plural_noun_phrase()."""
     assert plural_noun_phrase("ugly chicken") == "ugly chickens"
     assert singular_noun_cache["ugly chickens"] == "ugly chicken"
+
+
+def test_lru_cache():
+    """Test LRUCache."""
+    cache = LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.keys() == ["a", "c"]
@@ -0,0 +1,101 @@
+"""Test cache warm-up."""
+import asyncio
+
+from fastapi.testclient import TestClient
+import pytest
+
+from mouse_trapi import warmup
+from mouse_trapi.parse import ParseError
+from mouse_trapi.server import app
+from mouse_trapi.util import LRUCache, Name
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def progress(monkeypatch):
+    """Replace warm-up progress for one test."""
+    progress = warmup.WarmUpProgress()
+    monkeypatch.setattr(warmup, "progress", progress)
+    return progress
+
+
+def stub_lookups(monkeypatch, known_names, known_curies, failures=0):
+    """Stub out name and label lookups, failing every name lookup at first."""
+    calls = []
+
+    def name_to_curie(name):
+        calls.append(name)
+        if name not in known_names or len(calls) <= failures:
+            raise ParseError(f"Unrecognized thing '{name}'")
+        return Name(f"CURIE:{name}")
+
+    async def curies_to_names(curies, client):
+        return {
+            curie: Name(curie.lower())
+            for curie in curies
+            if curie in known_curies
+        }
+
+    monkeypatch.setattr(warmup, "name_to_curie", name_to_curie)
+    monkeypatch.setattr(warmup, "curies_to_names", curies_to_names)
+
+
+def test_warm_up(monkeypatch, progress):
+    """Test warm-up progress and health."""
+    stub_lookups(monkeypatch, {"asthma", "albuterol"}, {"CURIE:asthma", "CURIE:albuterol"})
+    assert client.get("/health/warm").status_code == 503
+    progress.state = "warming"
+    assert client.get("/health/warm").status_code == 503
+    asyncio.run(warmup.warm_up([Name("asthma"), Name("albuterol"), Name("aaagggh")]))
+    assert progress.to_json() == {"state": "warm", "attempts": 1, "total": 6, "done": 6, "failed": 2}
+    assert client.get("/health").json()["warmup"]["state"] == "warm"
+    assert client.get("/health/warm").status_code == 200
+
+
+def test_warm_up_retry(monkeypatch, progress):
+    """Test that a degraded warm-up is retried."""
+    stub_lookups(monkeypatch, {"asthma", "albuterol"}, {"CURIE:asthma", "CURIE:albuterol"}, failures=3)
+    asyncio.run(warmup.warm_up(
+        [Name("asthma"), Name("albuterol"), Name("aaagggh")],
+        retries=3,
+        backoff=0,
+    ))
+    assert progress.to_json() == {"state": "warm", "attempts": 2, "total": 6, "done": 6, "failed": 2}
+
+
+def test_warm_up_degraded(monkeypatch, progress):
+    """Test that warm-up is degraded when most lookups keep failing, but routable."""
+    stub_lookups(monkeypatch, {"asthma", "albuterol"}, set())
+    asyncio.run(warmup.warm_up(
+        [Name("asthma"), Name("albuterol"), Name("aaagggh")],
+        retries=2,
+        backoff=0,
+    ))
+    assert progress.to_json() == {"state": "degraded", "attempts": 3, "total": 6, "done": 6, "failed": 4}
+    response = client.get("/health/warm")
+    assert response.status_code == 200
+    assert response.json()["state"] == "degraded"
+
+
+def test_warm_up_failed(monkeypatch, progress):
+    """Test that warm-up fails, but is routable, when it keeps raising."""
+    def warm_vocabulary():
+        raise RuntimeError("no vocabulary")
+
+    monkeypatch.setattr(warmup, "warm_vocabulary", warm_vocabulary)
+    asyncio.run(warmup.warm_up([Name("asthma")], retries=1, backoff=0))
+    assert progress.state == "failed"
+    assert progress.attempts == 2
+    assert client.get("/health/warm").status_code == 200
+
+
+def test_save_recent_names(monkeypatch, tmp_path):
+    """Test saving and reading recent names."""
+    name_cache = LRUCache(10)
+    name_cache["asthma"] = Name("CURIE:asthma")
+    monkeypatch.setattr(warmup, "name_cache", name_cache)
+    path = tmp_path / "recent_names.txt"
+    warmup.save_recent_names(str(path))
+    assert warmup.read_names(str(path)) == ["asthma"]
+    assert list(tmp_path.iterdir()) == [path]